@@ -17,10 +17,12 @@ DATA_DIR = BASE_DIR / "data"
 RAW_DIR = DATA_DIR / "raw"
 PROCESSED_DIR = DATA_DIR / "processed"
 INDEX_DIR = DATA_DIR / "index"
+LLM_CACHE_DIR = INDEX_DIR / "llm_cache"
 
-# Ensure directories exist
-for dir_path in [DATA_DIR, RAW_DIR, PROCESSED_DIR, INDEX_DIR]:
-    dir_path.mkdir(parents=True, exist_ok=True)
+# Ensure directories exist (skip the mkdir calls once the tree is in place)
+if not INDEX_DIR.is_dir():
+    for dir_path in (DATA_DIR, RAW_DIR, PROCESSED_DIR, INDEX_DIR):
+        dir_path.mkdir(parents=True, exist_ok=True)
 
 # API Configuration
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
@@ -30,6 +32,21 @@ SUPPORTED_FILE_EXTENSIONS = {".txt", ".md", ".text"}
 MAX_CHUNK_SIZE = 1000  # Maximum characters per chunk
 CHUNK_OVERLAP = 100    # Overlap between chunks
 
+# Storage settings
+READ_CACHE_SIZE = 128             # Number of file contents kept in memory
+METADATA_LOG_MAX_BYTES = 1 << 20  # Compact the metadata log past this size
+MMAP_THRESHOLD = 1 << 20          # Parse metadata snapshots at least this large via mmap
+IO_THREAD_POOL_SIZE = 8           # Worker threads for blocking storage calls
+HASH_THREAD_POOL_SIZE = 8         # Upper bound on threads hashing raw files
+
+# LLM processing settings
+MAX_CONCURRENCY = 8  # Maximum simultaneous Anthropic requests
+MAX_REQUESTS_PER_MINUTE = 50  # Anthropic requests started per minute
+MAX_TOKENS_PER_MINUTE = 40000  # Anthropic input + output tokens per minute
+MAX_API_RETRIES = 5  # Retries (with backoff) on rate limits and server errors
+BATCH_POLL_INITIAL_INTERVAL = 5.0  # Seconds before first message batch status check
+BATCH_POLL_MAX_INTERVAL = 60.0     # Upper bound on backoff between status checks
+
 # Search settings
 MAX_SEARCH_RESULTS = 10
 KEYWORD_SEARCH_THRESHOLD = 0.6  # Fuzzy matching threshold
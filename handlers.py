@@ -3,28 +3,84 @@ Individual Tool Handlers for MCP Server
 Each handler implements a specific tool functionality
 """
 
+import asyncio
+from datetime import datetime
+from functools import cache
 from typing import Dict, Any, List
 from mcp.types import Tool, TextContent
 from tool_handlers import BaseToolHandler
-from config import SERVER_NAME, SERVER_VERSION, RAW_DIR, PROCESSED_DIR, INDEX_DIR
+from config import (
+    SERVER_NAME,
+    SERVER_VERSION,
+    RAW_DIR,
+    PROCESSED_DIR,
+    INDEX_DIR,
+)
+
+# Shared input schema for tools that take no arguments
+_EMPTY_SCHEMA = {"type": "object", "properties": {}, "required": []}
+
+
+def _filename_schema(description: str) -> Dict[str, Any]:
+    """Build the input schema for tools that take a single filename"""
+    return {
+        "type": "object",
+        "properties": {"filename": {"type": "string", "description": description}},
+        "required": ["filename"],
+    }
+
+
+def _processed_at(info: Dict[str, Any]) -> str:
+    """Render when a document was processed as a local ISO timestamp
+
+    Entries store epoch nanoseconds in processed_at_ns; older entries carry a
+    preformatted processed_at string instead.
+    """
+    processed_at_ns = info.get("processed_at_ns")
+    if processed_at_ns is None:
+        return info.get("processed_at", "Unknown")
+    return datetime.fromtimestamp(processed_at_ns / 1e9).isoformat()
+
+
+def _display_fields(info: Dict[str, Any]):
+    """Yield metadata fields for display, with timestamps rendered readably"""
+    for key, value in info.items():
+        if key == "processed_at_ns":
+            yield "processed_at", _processed_at(info)
+        else:
+            yield key, value
+
+
+# Everything around the file counts is fixed for the life of the process
+_STATUS_HEADER = f"""🔧 Handwritten Notes MCP Server Status
+
+Server: {SERVER_NAME} v{SERVER_VERSION}
+"""
+_STATUS_FOOTER = f"""
+Directory Structure:
+• Raw Files: {RAW_DIR}
+• Processed Files: {PROCESSED_DIR}
+• Index Files: {INDEX_DIR}
+
+Status: ✅ Ready for Phase 2 development"""
 
 
 class ListRawFilesHandler(BaseToolHandler):
     """Handler for listing raw files"""
 
     async def execute(self, arguments: Dict[str, Any]) -> List[TextContent]:
-        raw_files = self.storage.get_raw_files()
-        file_list = [f.name for f in raw_files]
-        text = f"Found {len(file_list)} raw files:\n" + "\n".join(
-            f"• {f}" for f in file_list
+        names = await asyncio.to_thread(self.storage.get_raw_file_names)
+        text = f"Found {len(names)} raw files:\n" + "\n".join(
+            "• " + name for name in names
         )
-        return [TextContent(text=text)]
+        return self.create_text_response(text)
 
+    @cache
     def get_tool_definition(self) -> Tool:
         return Tool(
             name="list_raw_files",
             description="List all raw handwritten text files available for processing",
-            inputSchema={"type": "object", "properties": {}, "required": []},
+            inputSchema=_EMPTY_SCHEMA,
         )
 
 
@@ -32,117 +88,99 @@ class ListProcessedFilesHandler(BaseToolHandler):
     """Handler for listing processed files"""
 
     async def execute(self, arguments: Dict[str, Any]) -> List[TextContent]:
-        processed_files = self.storage.get_processed_files()
-        file_list = [f.name for f in processed_files]
-        text = f"Found {len(file_list)} processed files:\n" + "\n".join(
-            f"• {f}" for f in file_list
+        names = await asyncio.to_thread(self.storage.get_processed_file_names)
+        text = f"Found {len(names)} processed files:\n" + "\n".join(
+            "• " + name for name in names
         )
-        return [TextContent(text=text)]
+        return self.create_text_response(text)
 
+    @cache
     def get_tool_definition(self) -> Tool:
         return Tool(
             name="list_processed_files",
             description="List all processed and cleaned text files",
-            inputSchema={"type": "object", "properties": {}, "required": []},
+            inputSchema=_EMPTY_SCHEMA,
         )
 
 
 class ReadRawFileHandler(BaseToolHandler):
     """Handler for reading raw files"""
 
+    REQUIRED = ("filename",)
+
     async def execute(self, arguments: Dict[str, Any]) -> List[TextContent]:
-        if error := self.validate_required_args(arguments, ["filename"]):
+        if error := self.validate_required_args(arguments):
             return self.create_text_response(error)
 
         filename = arguments["filename"]
-        content = self.storage.read_raw_file(filename)
+        content = await asyncio.to_thread(self.storage.read_raw_file, filename)
         if content is None:
             return self.create_text_response(
                 f"Error: Could not read file '{filename}' or file does not exist"
             )
 
-        return [TextContent(text=f"Content of '{filename}':\n\n{content}")]
+        return self.create_text_response(f"Content of '{filename}':\n\n{content}")
 
+    @cache
     def get_tool_definition(self) -> Tool:
         return Tool(
             name="read_raw_file",
             description="Read the content of a raw handwritten text file",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "filename": {
-                        "type": "string",
-                        "description": "Name of the file to read",
-                    }
-                },
-                "required": ["filename"],
-            },
+            inputSchema=_filename_schema("Name of the file to read"),
         )
 
 
 class ReadProcessedFileHandler(BaseToolHandler):
     """Handler for reading processed files"""
 
+    REQUIRED = ("filename",)
+
     async def execute(self, arguments: Dict[str, Any]) -> List[TextContent]:
-        if error := self.validate_required_args(arguments, ["filename"]):
-            return [TextContent(text=error)]
+        if error := self.validate_required_args(arguments):
+            return self.create_text_response(error)
 
         filename = arguments["filename"]
-        content = self.storage.read_processed_file(filename)
+        content = await asyncio.to_thread(self.storage.read_processed_file, filename)
         if content is None:
-            return [TextContent(text=f"Error: Could not read processed file '{filename}' or file does not exist")]
+            return self.create_text_response(f"Error: Could not read processed file '{filename}' or file does not exist")
 
-        return [TextContent(text=f"Content of processed '{filename}':\n\n{content}")]
+        return self.create_text_response(f"Content of processed '{filename}':\n\n{content}")
 
+    @cache
     def get_tool_definition(self) -> Tool:
         return Tool(
             name="read_processed_file",
             description="Read the content of a processed/cleaned text file",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "filename": {
-                        "type": "string",
-                        "description": "Name of the processed file to read",
-                    }
-                },
-                "required": ["filename"],
-            },
+            inputSchema=_filename_schema("Name of the processed file to read"),
         )
 
 
 class GetDocumentInfoHandler(BaseToolHandler):
     """Handler for getting document metadata"""
 
+    REQUIRED = ("filename",)
+
     async def execute(self, arguments: Dict[str, Any]) -> List[TextContent]:
-        if error := self.validate_required_args(arguments, ["filename"]):
-            return [TextContent(text=error)]
+        if error := self.validate_required_args(arguments):
+            return self.create_text_response(error)
 
         filename = arguments["filename"]
         info = self.storage.get_document_info(filename)
         if info is None:
-            return [TextContent(text=f"No metadata found for '{filename}'")]
+            return self.create_text_response(f"No metadata found for '{filename}'")
 
-        info_text = f"Document Information for '{filename}':\n\n"
-        for key, value in info.items():
-            info_text += f"• {key}: {value}\n"
+        info_text = f"Document Information for '{filename}':\n\n" + "".join(
+            f"• {key}: {value}\n" for key, value in _display_fields(info)
+        )
 
-        return [TextContent(text=info_text)]
+        return self.create_text_response(info_text)
 
+    @cache
     def get_tool_definition(self) -> Tool:
         return Tool(
             name="get_document_info",
             description="Get metadata and processing information for a specific document",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "filename": {
-                        "type": "string",
-                        "description": "Name of the document to get info for",
-                    }
-                },
-                "required": ["filename"],
-            },
+            inputSchema=_filename_schema("Name of the document to get info for"),
         )
 
 
@@ -153,22 +191,24 @@ class ListAllDocumentsHandler(BaseToolHandler):
         all_docs = self.storage.list_all_documents()
 
         if not all_docs:
-            return [TextContent(text="No documents found in the system")]
-
-        result_text = f"All Documents ({len(all_docs)} total):\n\n"
-        for filename, info in all_docs.items():
-            result_text += f"📄 {filename}\n"
-            result_text += f"   Processed: {info.get('processed_at', 'Unknown')}\n"
-            result_text += f"   Size: {info.get('size', 0)} bytes\n"
-            result_text += f"   Hash: {info.get('hash', 'Unknown')[:8]}...\n\n"
+            return self.create_text_response("No documents found in the system")
+
+        result_text = f"All Documents ({len(all_docs)} total):\n\n" + "".join(
+            f"📄 {filename}\n"
+            f"   Processed: {_processed_at(info)}\n"
+            f"   Size: {info.get('size', 0)} bytes\n"
+            f"   Hash: {info.get('hash', 'Unknown')[:8]}...\n\n"
+            for filename, info in all_docs.items()
+        )
 
-        return [TextContent(text=result_text)]
+        return self.create_text_response(result_text)
 
+    @cache
     def get_tool_definition(self) -> Tool:
         return Tool(
             name="list_all_documents",
             description="List all documents with their metadata and processing status",
-            inputSchema={"type": "object", "properties": {}, "required": []},
+            inputSchema=_EMPTY_SCHEMA,
         )
 
 
@@ -176,22 +216,24 @@ class CheckFilesNeedingProcessingHandler(BaseToolHandler):
     """Handler for checking which files need processing"""
 
     async def execute(self, arguments: Dict[str, Any]) -> List[TextContent]:
-        files_needing_processing = self.storage.get_files_needing_processing()
+        files_needing_processing = await asyncio.to_thread(
+            self.storage.get_files_needing_processing
+        )
 
         if not files_needing_processing:
-            return [TextContent(text="All files are up to date - no processing needed")]
+            return self.create_text_response("All files are up to date - no processing needed")
 
-        file_list = [f.name for f in files_needing_processing]
-        text = f"📋 Found {len(file_list)} files needing processing:\n" + "\n".join(
-            f"• {f}" for f in file_list
+        text = f"📋 Found {len(files_needing_processing)} files needing processing:\n" + "\n".join(
+            f"• {f.name}" for f in files_needing_processing
         )
-        return [TextContent(text=text)]
+        return self.create_text_response(text)
 
+    @cache
     def get_tool_definition(self) -> Tool:
         return Tool(
             name="check_files_needing_processing",
             description="Check which files need processing (new or changed files)",
-            inputSchema={"type": "object", "properties": {}, "required": []},
+            inputSchema=_EMPTY_SCHEMA,
         )
 
 
@@ -199,57 +241,128 @@ class GetServerStatusHandler(BaseToolHandler):
     """Handler for getting server status"""
 
     async def execute(self, arguments: Dict[str, Any]) -> List[TextContent]:
-        raw_files = len(self.storage.get_raw_files())
-        processed_files = len(self.storage.get_processed_files())
-        files_needing_processing = len(self.storage.get_files_needing_processing())
-
-        status_text = f"""🔧 Handwritten Notes MCP Server Status
-        
-Server: {SERVER_NAME} v{SERVER_VERSION}
-Raw Files: {raw_files}
-Processed Files: {processed_files}
-Files Needing Processing: {files_needing_processing}
-
-Directory Structure:
-• Raw Files: {RAW_DIR}
-• Processed Files: {PROCESSED_DIR}
-• Index Files: {INDEX_DIR}
+        raw_files = len(await asyncio.to_thread(self.storage.get_raw_file_names))
+        processed_files = len(await asyncio.to_thread(self.storage.get_processed_file_names))
+        files_needing_processing = len(
+            await asyncio.to_thread(self.storage.get_files_needing_processing)
+        )
 
-Status: ✅ Ready for Phase 2 development"""
+        status_text = (
+            f"{_STATUS_HEADER}"
+            f"Raw Files: {raw_files}\n"
+            f"Processed Files: {processed_files}\n"
+            f"Files Needing Processing: {files_needing_processing}\n"
+            f"{_STATUS_FOOTER}"
+        )
 
-        return [TextContent(text=status_text)]
+        return self.create_text_response(status_text)
 
+    @cache
     def get_tool_definition(self) -> Tool:
         return Tool(
             name="get_server_status",
             description="Get the current status of the MCP server and storage system",
-            inputSchema={"type": "object", "properties": {}, "required": []},
+            inputSchema=_EMPTY_SCHEMA,
         )
 
 
 class ProcessRawFileHandler(BaseToolHandler):
     """Handler for processing raw files"""
 
+    REQUIRED = ("filename",)
+
     async def execute(self, arguments: Dict[str, Any]) -> List[TextContent]:
-        if error := self.validate_required_args(arguments, ["filename"]):
-            return [TextContent(text=error)]
+        if error := self.validate_required_args(arguments):
+            return self.create_text_response(error)
 
         filename = arguments["filename"]
         result = await self.storage.process_raw_file(filename)
-        return [TextContent(text=result)]
+        return self.create_text_response(result)
 
+    @cache
     def get_tool_definition(self) -> Tool:
         return Tool(
             name="process_raw_file",
             description="Process a raw handwritten text file through LLM to improve formatting, fix typos, and correct OCR errors",
+            inputSchema=_filename_schema("Name of the raw file to process"),
+        )
+
+
+class ProcessRawFilesHandler(BaseToolHandler):
+    """Handler for processing several raw files concurrently"""
+
+    REQUIRED = ("filenames",)
+
+    async def execute(self, arguments: Dict[str, Any]) -> List[TextContent]:
+        if error := self.validate_required_args(arguments):
+            return self.create_text_response(error)
+
+        results = await self.storage.process_raw_files(
+            arguments["filenames"], arguments.get("concurrency")
+        )
+        return self.create_text_response("\n\n".join(results))
+
+    @cache
+    def get_tool_definition(self) -> Tool:
+        return Tool(
+            name="process_raw_files",
+            description="Process several raw handwritten text files through LLM concurrently",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "filenames": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Names of the raw files to process",
+                    },
+                    "concurrency": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "Maximum files processed at once (optional)",
+                    },
+                },
+                "required": ["filenames"],
+            },
+        )
+
+
+class BatchProcessRawFilesHandler(BaseToolHandler):
+    """Handler for processing raw files through the Message Batches API"""
+
+    async def execute(self, arguments: Dict[str, Any]) -> List[TextContent]:
+        result = await self.storage.batch_process_raw_files(arguments.get("filenames"))
+        return self.create_text_response(result)
+
+    @cache
+    def get_tool_definition(self) -> Tool:
+        return Tool(
+            name="batch_process_raw_files",
+            description="Process raw files through the Anthropic Message Batches API at reduced cost (slower; defaults to all files needing processing)",
             inputSchema={
                 "type": "object",
                 "properties": {
-                    "filename": {
-                        "type": "string",
-                        "description": "Name of the raw file to process",
+                    "filenames": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Names of the raw files to process (optional)",
                     }
                 },
-                "required": ["filename"],
+                "required": [],
             },
         )
+
+
+class ClearLlmCacheHandler(BaseToolHandler):
+    """Handler for clearing cached LLM responses"""
+
+    async def execute(self, arguments: Dict[str, Any]) -> List[TextContent]:
+        removed = await asyncio.to_thread(self.storage.clear_llm_cache)
+        return self.create_text_response(f"🧹 Cleared {removed} cached LLM responses")
+
+    @cache
+    def get_tool_definition(self) -> Tool:
+        return Tool(
+            name="clear_llm_cache",
+            description="Delete cached LLM responses so the next processing run calls the API again",
+            inputSchema=_EMPTY_SCHEMA,
+        )
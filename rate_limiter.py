@@ -0,0 +1,50 @@
+"""
+Async rate limiting for outbound API requests
+"""
+
+import asyncio
+import time
+
+
+class AsyncRateLimiter:
+    """Token bucket that limits how much work starts per period
+
+    Tokens refill continuously at capacity / period, so bursts of up to
+    capacity are allowed while sustained throughput stays at capacity per
+    period.
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        """Add the tokens accrued since the last update"""
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        """Wait until amount tokens are available, then take them"""
+        # A request larger than the bucket could never be satisfied otherwise
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= amount
+
+    def adjust(self, amount: float):
+        """Take (or with a negative amount, return) tokens without waiting
+
+        Used to reconcile an estimate with the actual cost once it is known.
+        The balance may go negative, which delays later acquire calls.
+        """
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens - amount)
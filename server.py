@@ -5,8 +5,9 @@ Basic file operations and MCP server setup with Tool Registry system
 
 import asyncio
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
@@ -25,6 +26,7 @@ from config import (
     INDEX_DIR,
     LOG_FILE,
     LOG_LEVEL,
+    IO_THREAD_POOL_SIZE,
 )
 from storage import DocumentStorage
 from tool_handlers import tool_registry
@@ -38,12 +40,17 @@ from handlers import (
     CheckFilesNeedingProcessingHandler,
     GetServerStatusHandler,
     ProcessRawFileHandler,
+    ProcessRawFilesHandler,
+    BatchProcessRawFilesHandler,
+    ClearLlmCacheHandler,
 )
 
 # Configure logging
 logger.remove()
 logger.add(sys.stderr, level=LOG_LEVEL)
-logger.add(LOG_FILE, rotation="10 MB", retention="10 days", level=LOG_LEVEL)
+logger.add(
+    LOG_FILE, rotation="10 MB", retention="10 days", level=LOG_LEVEL, enqueue=True
+)
 
 # Initialize MCP server
 server = Server(SERVER_NAME)
@@ -54,21 +61,24 @@ storage = DocumentStorage()
 
 # Register all tool handlers
 def register_tool_handlers():
-    """Register all tool handlers with the tool registry"""
+    """Register all tool handlers with the tool registry, keyed by tool name"""
     handlers = [
-        ("list_raw_files", ListRawFilesHandler(storage)),
-        ("list_processed_files", ListProcessedFilesHandler(storage)),
-        ("read_raw_file", ReadRawFileHandler(storage)),
-        ("read_processed_file", ReadProcessedFileHandler(storage)),
-        ("get_document_info", GetDocumentInfoHandler(storage)),
-        ("list_all_documents", ListAllDocumentsHandler(storage)),
-        ("check_files_needing_processing", CheckFilesNeedingProcessingHandler(storage)),
-        ("get_server_status", GetServerStatusHandler(storage)),
-        ("process_raw_file", ProcessRawFileHandler(storage)),
+        ListRawFilesHandler(storage),
+        ListProcessedFilesHandler(storage),
+        ReadRawFileHandler(storage),
+        ReadProcessedFileHandler(storage),
+        GetDocumentInfoHandler(storage),
+        ListAllDocumentsHandler(storage),
+        CheckFilesNeedingProcessingHandler(storage),
+        GetServerStatusHandler(storage),
+        ProcessRawFileHandler(storage),
+        ProcessRawFilesHandler(storage),
+        BatchProcessRawFilesHandler(storage),
+        ClearLlmCacheHandler(storage),
     ]
 
-    for name, handler in handlers:
-        tool_registry.register(name, handler)
+    for handler in handlers:
+        tool_registry.register(handler.get_tool_definition().name, handler)
 
 
 # Register handlers on import
@@ -76,7 +86,7 @@ register_tool_handlers()
 
 
 @server.list_tools()
-async def list_tools() -> List[Tool]:
+async def list_tools() -> Sequence[Tool]:
     """List available tools for the MCP server"""
     return tool_registry.get_tool_definitions()
 
@@ -94,13 +104,17 @@ async def main():
     logger.info(f"Processed files directory: {PROCESSED_DIR}")
     logger.info(f"Index directory: {INDEX_DIR}")
 
-    # Ensure directories exist
-    for directory in [RAW_DIR, PROCESSED_DIR, INDEX_DIR]:
-        directory.mkdir(parents=True, exist_ok=True)
+    # Handlers offload blocking storage calls with asyncio.to_thread; bound that pool
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=IO_THREAD_POOL_SIZE, thread_name_prefix="storage-io")
+    )
 
     # Run the server
-    async with stdio_server() as streams:
-        await server.run(streams[0], streams[1], server.create_initialization_options())
+    try:
+        async with stdio_server() as streams:
+            await server.run(streams[0], streams[1], server.create_initialization_options())
+    finally:
+        storage.close()
 
 
 if __name__ == "__main__":
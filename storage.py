@@ -2,16 +2,203 @@
 Storage system for managing documents and search indexes
 """
 
-import json
+import asyncio
 import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Any
-from datetime import datetime
+from typing import IO, Callable, Dict, List, Optional, Any, Set, Tuple
 import orjson
 from loguru import logger
-from anthropic import AsyncAnthropic
+import httpx
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
 
-from config import PROCESSED_DIR, INDEX_DIR, RAW_DIR, ANTHROPIC_API_KEY
+from rate_limiter import AsyncRateLimiter
+from config import (
+    PROCESSED_DIR,
+    INDEX_DIR,
+    RAW_DIR,
+    LLM_CACHE_DIR,
+    ANTHROPIC_API_KEY,
+    SUPPORTED_FILE_EXTENSIONS,
+    READ_CACHE_SIZE,
+    METADATA_LOG_MAX_BYTES,
+    MMAP_THRESHOLD,
+    HASH_THREAD_POOL_SIZE,
+    MAX_CONCURRENCY,
+    MAX_REQUESTS_PER_MINUTE,
+    MAX_TOKENS_PER_MINUTE,
+    MAX_API_RETRIES,
+    BATCH_POLL_INITIAL_INTERVAL,
+    BATCH_POLL_MAX_INTERVAL,
+)
+
+# Content hashes used for change detection, keyed by the hash_algo tag stored
+# in metadata; entries written before the tag existed were hashed with md5
+_HASH_FACTORIES: Dict[str, Callable[[], Any]] = {
+    "md5": hashlib.md5,
+    "blake2b": hashlib.blake2b,
+    "blake2b-128": lambda: hashlib.blake2b(digest_size=16),
+}
+_HASH_ALGORITHM = "blake2b-128"
+_LEGACY_HASH_ALGORITHM = "md5"
+_HASH_CHUNK_SIZE = 1 << 20
+
+# Streamed LLM output is buffered up to this many characters per disk write
+_STREAM_FLUSH_CHARS = 64 * 1024
+
+# Process umask, read once (os.umask can only be queried by setting it) so
+# temporary files can be created with the mode open() would give them
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# Per-thread read buffer for hashing, reused across calls; files are hashed
+# from several worker threads at once, so a single shared buffer would race
+_hash_buffers = threading.local()
+
+# System prompt for LLM cleanup of OCR'd handwritten text
+SYSTEM_PROMPT = """You are a document processor that improves handwritten text that has been converted through OCR. Your task is to:
+
+1. Fix OCR errors and typos
+2. Improve formatting and structure
+3. Maintain the original meaning and content
+4. Organize the text into proper paragraphs
+5. Fix punctuation and capitalization
+6. Preserve important information like dates, names, numbers
+
+Return only the cleaned and formatted text without any additional commentary or explanation."""
+
+# Leading block of every user turn; the raw text follows as its own block
+_INSTRUCTION_BLOCK = {"type": "text", "text": "Please process and improve this handwritten text:"}
+
+
+@lru_cache(maxsize=READ_CACHE_SIZE)
+def _read_text_cached(file_path: str, mtime_ns: int, size: int) -> str:
+    """Read a text file, memoized on its path and stat fingerprint
+    
+    mtime_ns and size are only part of the cache key: when the file changes
+    on disk the key changes too, so stale content is never returned.
+    """
+    # Unbuffered read of the whole file, decoded as text-mode open() would
+    with open(file_path, 'rb', buffering=0) as f:
+        return _decode_text(f.readall())
+
+
+def _decode_text(data: bytes) -> str:
+    """Decode UTF-8 file content with universal newlines"""
+    text = data.decode('utf-8')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def _write_bytes(file_path: str, data: bytes):
+    """Write data to a file through a raw file descriptor"""
+    fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def _hash_buffer() -> memoryview:
+    """Return this thread's reusable hashing buffer"""
+    view = getattr(_hash_buffers, "view", None)
+    if view is None:
+        view = _hash_buffers.view = memoryview(bytearray(_HASH_CHUNK_SIZE))
+    return view
+
+
+def _estimate_input_tokens(params: Dict[str, Any]) -> int:
+    """Rough input token count for a Messages request (about 4 characters per token)"""
+    chars = len(params["system"])
+    chars += sum(
+        len(block["text"]) for message in params["messages"] for block in message["content"]
+    )
+    return chars // 4
+
+
+def _format_preview(text: str, preview_length: int = 300) -> str:
+    """Truncate text for display, marking when it was cut short"""
+    if len(text) > preview_length:
+        return text[:preview_length] + "..."
+    return text
+
+
+def _copy_file(src: Path, dst: Path):
+    """Copy a file, letting the kernel move the bytes where possible
+    
+    os.copy_file_range copies inside the kernel (or reflinks, on filesystems
+    that support it) without passing data through userspace. Platforms or
+    filesystems without it fall back to a regular copy.
+    """
+    if not hasattr(os, "copy_file_range"):
+        shutil.copyfile(src, dst)
+        return
+    
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        remaining = os.fstat(fsrc.fileno()).st_size
+        try:
+            while remaining > 0:
+                copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        except OSError:
+            # e.g. EXDEV across filesystems on older kernels; start over in userspace
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+            shutil.copyfileobj(fsrc, fdst)
+
+
+def _temp_sibling(file_path: Path) -> Path:
+    """Create an empty, uniquely named temporary file beside file_path
+    
+    Each writer gets its own name, so concurrent writes to the same target
+    never share (or unlink) each other's temp file. mkstemp creates files
+    as 0600; they are given the usual umask-derived mode instead, since
+    they end up replacing regular files.
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=file_path.parent, prefix=file_path.name + ".", suffix=".tmp"
+    )
+    try:
+        if hasattr(os, "fchmod"):
+            os.fchmod(fd, 0o666 & ~_UMASK)
+    finally:
+        os.close(fd)
+    return Path(tmp_path)
+
+
+def _discard_temp(f: Optional[IO], tmp_path: Path):
+    """Close a temporary file if still open and remove it if it was not moved into place"""
+    if f is not None:
+        f.close()
+    tmp_path.unlink(missing_ok=True)
+
+
+def _atomic_write_bytes(file_path: Path, data: bytes):
+    """Write data to a temporary sibling file, then swap it into place
+    
+    os.replace is atomic, so readers (and a crash mid-write) never see a
+    partially written file.
+    """
+    tmp_path = _temp_sibling(file_path)
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, file_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
 
 
 class DocumentStorage:
@@ -19,80 +206,349 @@ class DocumentStorage:
     
     def __init__(self):
         self.metadata_file = INDEX_DIR / "document_metadata.json"
+        # Per-document updates are appended here and folded into
+        # metadata_file on startup or once the log grows too large
+        self.metadata_log_file = INDEX_DIR / "document_metadata.log"
+        self._metadata_log = None
         self.metadata = self._load_metadata()
-        # Initialize Anthropic client as instance variable
-        self.anthropic_client = AsyncAnthropic(api_key=ANTHROPIC_API_KEY) if ANTHROPIC_API_KEY else None
+        if self._replay_metadata_log():
+            self.compact_metadata()
+        # File hashes keyed by name, stored with the stat fingerprint they were
+        # computed for: [mtime_ns, size, algorithm, digest]
+        self.hash_cache_file = INDEX_DIR / "hash_cache.json"
+        self._hash_cache: Dict[str, List[Any]] = self._load_hash_cache()
+        self._hash_cache_dirty = False
+        # Serialize metadata and hash cache writes made from worker threads
+        self._metadata_lock = threading.Lock()
+        self._hash_cache_lock = threading.Lock()
+        # Directory listings (sorted file names) keyed by directory path, stored
+        # with the directory's mtime_ns when scanned
+        self._file_list_cache: Dict[Path, Tuple[int, List[str]]] = {}
+        # Directory prefixes for building file paths as plain strings on the
+        # read/write paths, skipping Path construction per call
+        self._raw_dir_prefix = os.path.join(RAW_DIR, "")
+        self._processed_dir_prefix = os.path.join(PROCESSED_DIR, "")
+        # Anthropic client is created on first use, see anthropic_client
+        self._anthropic_client: Optional[AsyncAnthropic] = None
+        # Paces request starts so concurrent processing stays under the rate limit
+        self._request_limiter = AsyncRateLimiter(MAX_REQUESTS_PER_MINUTE)
+        self._token_limiter = AsyncRateLimiter(MAX_TOKENS_PER_MINUTE)
+    
+    @property
+    def anthropic_client(self) -> Optional[AsyncAnthropic]:
+        """Anthropic client, created on first use; None if no API key is configured
+        
+        The connection pool is sized for MAX_CONCURRENCY requests in flight so
+        concurrent processing reuses keep-alive connections instead of paying
+        for new TLS handshakes.
+        """
+        if self._anthropic_client is None and ANTHROPIC_API_KEY:
+            pool_size = MAX_CONCURRENCY * 2
+            # The SDK retries 429s and 5xx with exponential backoff, honoring Retry-After
+            self._anthropic_client = AsyncAnthropic(
+                api_key=ANTHROPIC_API_KEY,
+                max_retries=MAX_API_RETRIES,
+                http_client=DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=pool_size,
+                        max_keepalive_connections=pool_size,
+                    )
+                ),
+            )
+        return self._anthropic_client
     
     def _load_metadata(self) -> Dict[str, Any]:
         """Load document metadata from storage"""
         if self.metadata_file.exists():
             try:
                 with open(self.metadata_file, 'rb') as f:
+                    if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+                        # Parse large snapshots straight from the page cache
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                            with memoryview(mm) as view:
+                                return orjson.loads(view)
                     return orjson.loads(f.read())
             except Exception as e:
                 logger.warning(f"Failed to load metadata: {e}")
                 return {}
         return {}
     
-    def _save_metadata(self):
+    def _save_metadata(self) -> bool:
         """Save document metadata to storage"""
         try:
-            with open(self.metadata_file, 'wb') as f:
-                f.write(orjson.dumps(self.metadata, option=orjson.OPT_INDENT_2))
+            _atomic_write_bytes(self.metadata_file, orjson.dumps(self.metadata))
+            return True
         except Exception as e:
             logger.error(f"Failed to save metadata: {e}")
+            return False
     
-    def _get_file_hash(self, file_path: Path) -> str:
-        """Generate hash for file content"""
+    def _replay_metadata_log(self) -> bool:
+        """Apply logged metadata updates on top of the snapshot
+        
+        Returns True if any updates were replayed.
+        """
+        if not self.metadata_log_file.exists():
+            return False
+        
+        replayed = False
+        try:
+            with open(self.metadata_log_file, 'rb') as f:
+                for line in f:
+                    try:
+                        self.metadata.update(orjson.loads(line))
+                        replayed = True
+                    except orjson.JSONDecodeError:
+                        # A crash mid-append can leave a truncated last line
+                        logger.warning("Skipping unreadable metadata log entry")
+        except Exception as e:
+            logger.warning(f"Failed to replay metadata log: {e}")
+        return replayed
+    
+    def _append_metadata_log(self, update: Dict[str, Any]):
+        """Append one metadata update to the log, compacting once it grows too large"""
         try:
+            if self._metadata_log is None:
+                self._metadata_log = open(self.metadata_log_file, 'ab', buffering=0)
+            self._metadata_log.write(orjson.dumps(update, option=orjson.OPT_APPEND_NEWLINE))
+            if self._metadata_log.tell() > METADATA_LOG_MAX_BYTES:
+                self.compact_metadata()
+        except Exception as e:
+            logger.error(f"Failed to append metadata log: {e}")
+    
+    def compact_metadata(self):
+        """Fold the metadata log into the snapshot file and start a fresh log"""
+        if not self._save_metadata():
+            return
+        if self._metadata_log is not None:
+            self._metadata_log.close()
+            self._metadata_log = None
+        try:
+            self.metadata_log_file.unlink(missing_ok=True)
+        except Exception as e:
+            logger.error(f"Failed to remove metadata log: {e}")
+    
+    def close(self):
+        """Fold any logged metadata updates into the snapshot before shutdown"""
+        with self._metadata_lock:
+            if self._metadata_log is not None:
+                self.compact_metadata()
+        self._save_hash_cache()
+    
+    def _load_hash_cache(self) -> Dict[str, List[Any]]:
+        """Load cached file hashes from storage"""
+        if self.hash_cache_file.exists():
+            try:
+                with open(self.hash_cache_file, 'rb') as f:
+                    return orjson.loads(f.read())
+            except Exception as e:
+                logger.warning(f"Failed to load hash cache: {e}")
+                return {}
+        return {}
+    
+    def _save_hash_cache(self):
+        """Save cached file hashes to storage if they changed"""
+        with self._hash_cache_lock:
+            if not self._hash_cache_dirty:
+                return
+            try:
+                _atomic_write_bytes(self.hash_cache_file, orjson.dumps(self._hash_cache))
+                self._hash_cache_dirty = False
+            except Exception as e:
+                logger.error(f"Failed to save hash cache: {e}")
+    
+    def _prune_hash_cache(self, names: Set[str]):
+        """Drop cached hashes for raw files a full scan no longer sees"""
+        # list() copies the keys in one step; worker threads may be adding entries
+        stale = [name for name in list(self._hash_cache) if name not in names]
+        for name in stale:
+            self._hash_cache.pop(name, None)
+        if stale:
+            self._hash_cache_dirty = True
+    
+    def _get_cached_file_hash(
+        self,
+        file_path: Path,
+        st: Optional[os.stat_result] = None,
+        algorithm: str = _HASH_ALGORITHM,
+    ) -> str:
+        """Hash a file, skipping the read when its mtime and size are unchanged"""
+        if st is None:
+            try:
+                st = file_path.stat()
+            except OSError as e:
+                logger.error(f"Failed to hash file {file_path}: {e}")
+                return ""
+        
+        cached = self._hash_cache.get(file_path.name)
+        if cached is not None and cached[:3] == [st.st_mtime_ns, st.st_size, algorithm]:
+            return cached[3]
+        
+        digest = self._get_file_hash(file_path, algorithm)
+        if digest:
+            self._hash_cache[file_path.name] = [st.st_mtime_ns, st.st_size, algorithm, digest]
+            self._hash_cache_dirty = True
+        return digest
+    
+    def _get_file_hash(self, file_path: Path, algorithm: str = _HASH_ALGORITHM) -> str:
+        """Generate hash for file content, streamed in fixed-size chunks"""
+        try:
+            h = _HASH_FACTORIES[algorithm]()
+            # Plain reads rather than mmap: raw notes are edited outside the
+            # server, and a mapped file truncated mid-hash raises SIGBUS
             with open(file_path, 'rb') as f:
-                return hashlib.md5(f.read()).hexdigest()
+                view = _hash_buffer()
+                while n := f.readinto(view):
+                    h.update(view[:n])
+            return h.hexdigest()
         except Exception as e:
             logger.error(f"Failed to hash file {file_path}: {e}")
             return ""
     
+    def _dir_mtime_ns(self, directory: Path) -> Optional[int]:
+        """Directory mtime, which changes whenever entries are added, removed or renamed"""
+        try:
+            return directory.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+    
+    def _list_file_names(self, directory: Path) -> List[str]:
+        """List text file names in a directory, reusing the last listing if it is unchanged"""
+        # Stat before scanning so a change racing the scan invalidates the result
+        mtime_ns = self._dir_mtime_ns(directory)
+        cached = self._file_list_cache.get(directory)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        
+        names = [entry.name for entry in self._scan_dir(directory)]
+        if mtime_ns is not None:
+            self._file_list_cache[directory] = (mtime_ns, names)
+        return names
+    
+    def _scan_dir(self, directory: Path) -> List[os.DirEntry]:
+        """Scan a directory once for supported text files, sorted by name"""
+        try:
+            with os.scandir(directory) as it:
+                entries = [
+                    entry for entry in it
+                    if os.path.splitext(entry.name)[1] in SUPPORTED_FILE_EXTENSIONS
+                    and entry.is_file()
+                ]
+        except FileNotFoundError:
+            return []
+        entries.sort(key=lambda entry: entry.name)
+        return entries
+    
+    def _invalidate_file_list(self, directory: Path):
+        """Drop the cached listing for a directory"""
+        self._file_list_cache.pop(directory, None)
+    
+    def get_raw_file_names(self) -> List[str]:
+        """Get the names of all raw text files"""
+        return self._list_file_names(RAW_DIR)
+    
+    def get_processed_file_names(self) -> List[str]:
+        """Get the names of all processed files"""
+        return self._list_file_names(PROCESSED_DIR)
+    
     def get_raw_files(self) -> List[Path]:
         """Get all raw text files"""
-        files = []
-        for ext in [".txt", ".md", ".text"]:
-            files.extend(RAW_DIR.glob(f"*{ext}"))
-        return sorted(files)
+        return [RAW_DIR / name for name in self.get_raw_file_names()]
     
     def get_processed_files(self) -> List[Path]:
         """Get all processed files"""
-        files = []
-        for ext in [".txt", ".md", ".text"]:
-            files.extend(PROCESSED_DIR.glob(f"*{ext}"))
-        return sorted(files)
-    
-    def file_needs_processing(self, raw_file: Path) -> bool:
-        """Check if a raw file needs processing"""
-        if not raw_file.exists():
-            return False
+        return [PROCESSED_DIR / name for name in self.get_processed_file_names()]
+    
+    def file_needs_processing(
+        self, raw_file: Path, st: Optional[os.stat_result] = None
+    ) -> bool:
+        """Check if a raw file needs processing
         
-        file_key = str(raw_file.name)
-        current_hash = self._get_file_hash(raw_file)
+        Callers that already hold a stat result for the file (e.g. from a
+        directory scan) can pass it in to avoid another syscall.
+        """
+        if st is None:
+            try:
+                st = raw_file.stat()
+            except FileNotFoundError:
+                return False
         
+        needs_processing = self._needs_processing_from_stat(raw_file.name, st)
+        if needs_processing is not None:
+            return needs_processing
+        return self._content_changed(raw_file, st)
+    
+    def _needs_processing_from_stat(
+        self, file_key: str, st: os.stat_result
+    ) -> Optional[bool]:
+        """Decide from metadata and stat alone; None means the content must be hashed"""
         # Check if file is new or changed
         if file_key not in self.metadata:
             return True
         
-        stored_hash = self.metadata[file_key].get("hash", "")
-        return current_hash != stored_hash
+        info = self.metadata[file_key]
+        
+        # A size change means the content changed, no need to hash
+        if info.get("size") != st.st_size:
+            return True
+        
+        # Same size and mtime as when processed: treat as unchanged without reading it
+        if info.get("mtime_ns") == st.st_mtime_ns:
+            return False
+        
+        return None
     
-    def mark_file_processed(self, raw_file: Path, processed_file: Path):
-        """Mark a file as processed and update metadata"""
+    def _content_changed(self, raw_file: Path, st: os.stat_result) -> bool:
+        """Compare a file's current hash with the one stored in its metadata"""
+        info = self.metadata[raw_file.name]
+        # Compare with the algorithm the stored hash was made with
+        algorithm = info.get("hash_algo", _LEGACY_HASH_ALGORITHM)
+        current_hash = self._get_cached_file_hash(raw_file, st, algorithm)
+        return current_hash != info.get("hash", "")
+    
+    def mark_file_processed(
+        self,
+        raw_file: Path,
+        processed_file: Path,
+        snapshot: Optional[Tuple[os.stat_result, str]] = None,
+    ):
+        """Mark a file as processed and update metadata
+        
+        snapshot is the (stat, hash) of the raw content that was actually
+        processed, when the caller read it (see _read_raw_snapshot); without
+        it the file is statted and hashed as it is now.
+        """
         file_key = str(raw_file.name)
         
-        self.metadata[file_key] = {
-            "hash": self._get_file_hash(raw_file),
-            "processed_at": datetime.now().isoformat(),
-            "raw_path": str(raw_file),
-            "processed_path": str(processed_file),
-            "size": raw_file.stat().st_size if raw_file.exists() else 0
-        }
+        if snapshot is not None:
+            st, file_hash = snapshot
+        else:
+            file_hash = None
+            try:
+                st = raw_file.stat()
+            except FileNotFoundError:
+                st = None
         
-        self._save_metadata()
+        with self._metadata_lock:
+            if file_hash is not None:
+                # The stat and hash describe the same read, so they can seed the cache
+                self._hash_cache[file_key] = [st.st_mtime_ns, st.st_size, _HASH_ALGORITHM, file_hash]
+                self._hash_cache_dirty = True
+            elif st:
+                file_hash = self._get_cached_file_hash(raw_file, st)
+            entry = {
+                "hash": file_hash or "",
+                "hash_algo": _HASH_ALGORITHM,
+                # Epoch nanoseconds; formatted for display only when shown
+                "processed_at_ns": time.time_ns(),
+                "raw_path": str(raw_file),
+                "processed_path": str(processed_file),
+                "size": st.st_size if st else 0,
+                "mtime_ns": st.st_mtime_ns if st else 0,
+            }
+            self.metadata[file_key] = entry
+            
+            self._append_metadata_log({file_key: entry})
+            self._save_hash_cache()
         logger.info(f"Marked {raw_file.name} as processed")
     
     def get_document_info(self, filename: str) -> Optional[Dict[str, Any]]:
@@ -100,42 +556,61 @@ class DocumentStorage:
         return self.metadata.get(filename)
     
     def list_all_documents(self) -> Dict[str, Any]:
-        """List all documents with their metadata"""
-        return self.metadata
+        """List all documents with their metadata
+        
+        Returns a snapshot: worker threads add entries while files are being
+        processed, so callers must not iterate the live dict.
+        """
+        with self._metadata_lock:
+            return dict(self.metadata)
     
     def read_raw_file(self, filename: str) -> Optional[str]:
         """Read content from a raw file"""
-        raw_file = RAW_DIR / filename
-        if not raw_file.exists():
+        raw_file = self._raw_dir_prefix + filename
+        try:
+            st = os.stat(raw_file)
+        except FileNotFoundError:
             return None
         
         try:
-            with open(raw_file, 'r', encoding='utf-8') as f:
-                return f.read()
+            return _read_text_cached(raw_file, st.st_mtime_ns, st.st_size)
         except Exception as e:
             logger.error(f"Failed to read {filename}: {e}")
             return None
     
+    def _read_raw_snapshot(self, filename: str) -> Tuple[str, os.stat_result, str]:
+        """Read a raw file along with the stat and hash of exactly that content
+        
+        Raises OSError or UnicodeDecodeError if the file cannot be read.
+        """
+        with open(self._raw_dir_prefix + filename, 'rb', buffering=0) as f:
+            st = os.fstat(f.fileno())
+            data = f.readall()
+        h = _HASH_FACTORIES[_HASH_ALGORITHM]()
+        h.update(data)
+        return _decode_text(data), st, h.hexdigest()
+    
     def read_processed_file(self, filename: str) -> Optional[str]:
         """Read content from a processed file"""
-        processed_file = PROCESSED_DIR / filename
-        if not processed_file.exists():
+        processed_file = self._processed_dir_prefix + filename
+        try:
+            st = os.stat(processed_file)
+        except FileNotFoundError:
             return None
         
         try:
-            with open(processed_file, 'r', encoding='utf-8') as f:
-                return f.read()
+            return _read_text_cached(processed_file, st.st_mtime_ns, st.st_size)
         except Exception as e:
             logger.error(f"Failed to read processed {filename}: {e}")
             return None
     
     def write_processed_file(self, filename: str, content: str) -> bool:
         """Write content to a processed file"""
-        processed_file = PROCESSED_DIR / filename
+        processed_file = self._processed_dir_prefix + filename
         
         try:
-            with open(processed_file, 'w', encoding='utf-8') as f:
-                f.write(content)
+            _write_bytes(processed_file, content.encode('utf-8'))
+            self._invalidate_file_list(PROCESSED_DIR)
             logger.info(f"Saved processed file: {filename}")
             return True
         except Exception as e:
@@ -144,8 +619,164 @@ class DocumentStorage:
     
     def get_files_needing_processing(self) -> List[Path]:
         """Get list of files that need processing"""
-        raw_files = self.get_raw_files()
-        return [f for f in raw_files if self.file_needs_processing(f)]
+        mtime_ns = self._dir_mtime_ns(RAW_DIR)
+        entries = self._scan_dir(RAW_DIR)
+        # The scan is fresh, so let it serve later listings too
+        if mtime_ns is not None:
+            self._file_list_cache[RAW_DIR] = (mtime_ns, [entry.name for entry in entries])
+        self._prune_hash_cache({entry.name for entry in entries})
+        # Files never processed are new by definition, so only entries already
+        # in metadata need a stat (and possibly a hash) to decide
+        known = self.metadata.keys()
+        raw_files: List[Path] = []
+        stats: List[Optional[os.stat_result]] = []
+        decisions: List[Optional[bool]] = []
+        for entry in entries:
+            if entry.name not in known:
+                st, decision = None, True
+            else:
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    # Deleted since the scan
+                    continue
+                decision = self._needs_processing_from_stat(entry.name, st)
+            raw_files.append(Path(entry.path))
+            stats.append(st)
+            decisions.append(decision)
+        
+        # Hash the undecided files in parallel; hashlib releases the GIL
+        pending = [i for i, decision in enumerate(decisions) if decision is None]
+        if pending:
+            workers = min(HASH_THREAD_POOL_SIZE, os.cpu_count() or 1, len(pending))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                changed = executor.map(
+                    lambda i: self._content_changed(raw_files[i], stats[i]), pending
+                )
+                for i, content_changed in zip(pending, changed):
+                    decisions[i] = content_changed
+        
+        self._save_hash_cache()
+        return [raw_file for raw_file, decision in zip(raw_files, decisions) if decision]
+    
+    def _build_message_params(self, raw_content: str) -> Dict[str, Any]:
+        """Build the Messages API parameters for cleaning up one raw document"""
+        content = [_INSTRUCTION_BLOCK]
+        # The API rejects empty text blocks
+        if raw_content:
+            content.append({"type": "text", "text": raw_content})
+        return {
+            "model": "claude-3-5-sonnet-20241022",
+            "max_tokens": 4000,
+            "system": SYSTEM_PROMPT,
+            "messages": [{"role": "user", "content": content}],
+        }
+    
+    def _llm_cache_file(self, params: Dict[str, Any]) -> Path:
+        """Cache location for a request, keyed on a hash of all its parameters"""
+        key = hashlib.blake2b(
+            orjson.dumps(params, option=orjson.OPT_SORT_KEYS), digest_size=16
+        ).hexdigest()
+        return LLM_CACHE_DIR / key
+    
+    def _restore_from_llm_cache(
+        self, cache_file: Path, processed_file: Path, preview_length: int = 300
+    ) -> Optional[str]:
+        """Copy a cached LLM response into place, returning a preview or None on a miss"""
+        if not cache_file.exists():
+            return None
+        
+        # Copy beside the processed file and swap it in, so a failure partway
+        # through never leaves a truncated processed file
+        tmp_file = _temp_sibling(processed_file)
+        try:
+            _copy_file(cache_file, tmp_file)
+            os.replace(tmp_file, processed_file)
+        finally:
+            tmp_file.unlink(missing_ok=True)
+        self._invalidate_file_list(PROCESSED_DIR)
+        with open(processed_file, 'r', encoding='utf-8') as f:
+            head = f.read(preview_length + 1)
+        return _format_preview(head, preview_length)
+    
+    def _store_in_llm_cache(self, processed_file: Path, cache_file: Path):
+        """Save a processed file as the cached response for its request"""
+        try:
+            LLM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            # Unique temp name: files with identical content share a cache key
+            # and may be stored concurrently
+            tmp_file = _temp_sibling(cache_file)
+            try:
+                _copy_file(processed_file, tmp_file)
+                os.replace(tmp_file, cache_file)
+            finally:
+                tmp_file.unlink(missing_ok=True)
+        except Exception as e:
+            logger.warning(f"Failed to cache LLM response for {processed_file.name}: {e}")
+    
+    def clear_llm_cache(self) -> int:
+        """Delete all cached LLM responses, returning how many were removed"""
+        if not LLM_CACHE_DIR.exists():
+            return 0
+        
+        removed = 0
+        with os.scandir(LLM_CACHE_DIR) as it:
+            for entry in it:
+                # Skip temp files belonging to stores still in progress
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    os.unlink(entry.path)
+                    removed += 1
+        logger.info(f"Cleared {removed} cached LLM responses")
+        return removed
+    
+    async def _stream_processed_file(
+        self, processed_file: Path, params: Dict[str, Any], preview_length: int = 300
+    ) -> str:
+        """Stream an LLM response straight to a processed file, returning a preview
+        
+        Text is written as it arrives, in batches of _STREAM_FLUSH_CHARS and
+        off the event loop, into a temporary sibling that replaces the
+        processed file only once the response completes, so a failed request
+        never leaves partial output behind.
+        """
+        preview = ""
+        estimated_tokens = _estimate_input_tokens(params)
+        await self._request_limiter.acquire()
+        await self._token_limiter.acquire(estimated_tokens)
+        
+        tmp_file = await asyncio.to_thread(_temp_sibling, processed_file)
+        f = None
+        try:
+            f = await asyncio.to_thread(open, tmp_file, 'w', encoding='utf-8')
+            pending: List[str] = []
+            pending_chars = 0
+            async with self.anthropic_client.messages.stream(**params) as stream:
+                async for text in stream.text_stream:
+                    pending.append(text)
+                    pending_chars += len(text)
+                    if pending_chars >= _STREAM_FLUSH_CHARS:
+                        await asyncio.to_thread(f.write, "".join(pending))
+                        pending.clear()
+                        pending_chars = 0
+                    # Keep one character past the limit to know whether to add '...'
+                    if len(preview) <= preview_length:
+                        preview += text[:preview_length + 1 - len(preview)]
+                
+                # Charge the real usage (including output) against the token budget
+                usage = (await stream.get_final_message()).usage
+                self._token_limiter.adjust(
+                    usage.input_tokens + usage.output_tokens - estimated_tokens
+                )
+            
+            await asyncio.to_thread(f.write, "".join(pending))
+            await asyncio.to_thread(f.close)
+            await asyncio.to_thread(os.replace, tmp_file, processed_file)
+        finally:
+            await asyncio.to_thread(_discard_temp, f, tmp_file)
+        
+        self._invalidate_file_list(PROCESSED_DIR)
+        logger.info(f"Saved processed file: {processed_file.name}")
+        return _format_preview(preview, preview_length)
     
     async def process_raw_file(self, filename: str) -> str:
         """Process a raw file through LLM to improve formatting and fix OCR errors"""
@@ -154,54 +785,208 @@ class DocumentStorage:
         if not self.anthropic_client:
             return "Error: ANTHROPIC_API_KEY not configured. Please set the API key in your environment."
         
-        # Check if file exists and needs processing
+        # Read raw file content off the event loop, with the stat and hash
+        # that describe what is sent to the LLM
         raw_file = RAW_DIR / filename
-        if not raw_file.exists():
+        try:
+            raw_content, st, file_hash = await asyncio.to_thread(
+                self._read_raw_snapshot, filename
+            )
+        except FileNotFoundError:
             return f"Error: File '{filename}' not found in raw directory"
-        
-        # Read raw file content
-        raw_content = self.read_raw_file(filename)
-        if raw_content is None:
+        except Exception as e:
+            logger.error(f"Failed to read {filename}: {e}")
             return f"Error: Could not read file '{filename}'"
         
         try:
             # Process the content through LLM
             logger.info(f"Processing file {filename} through LLM...")
+            processed_file = PROCESSED_DIR / filename
+            params = self._build_message_params(raw_content)
             
-            system_prompt = """You are a document processor that improves handwritten text that has been converted through OCR. Your task is to:
-
-1. Fix OCR errors and typos
-2. Improve formatting and structure
-3. Maintain the original meaning and content
-4. Organize the text into proper paragraphs
-5. Fix punctuation and capitalization
-6. Preserve important information like dates, names, numbers
-
-Return only the cleaned and formatted text without any additional commentary or explanation."""
-
-            response = await self.anthropic_client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=4000,
-                system=system_prompt,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": f"Please process and improve this handwritten text:\n\n{raw_content}"
-                    }
-                ]
+            # Identical content and prompt gives the same request, so reuse its output
+            cache_file = self._llm_cache_file(params)
+            preview = await asyncio.to_thread(
+                self._restore_from_llm_cache, cache_file, processed_file
             )
+            if preview is not None:
+                logger.info(f"Reused cached LLM response for {filename}")
+            else:
+                preview = await self._stream_processed_file(processed_file, params)
+                await asyncio.to_thread(self._store_in_llm_cache, processed_file, cache_file)
             
-            processed_content = response.content[0].text
+            # Update metadata
+            await asyncio.to_thread(
+                self.mark_file_processed, raw_file, processed_file, (st, file_hash)
+            )
             
-            # Write processed content to file
-            if self.write_processed_file(filename, processed_content):
-                # Update metadata
-                self.mark_file_processed(raw_file, PROCESSED_DIR / filename)
-                
-                return f"✅ Successfully processed '{filename}'\n\nProcessed content saved to: {PROCESSED_DIR / filename}\n\nPreview of processed content:\n{processed_content[:300]}{'...' if len(processed_content) > 300 else ''}"
-            else:
-                return f"Error: Failed to save processed content for '{filename}'"
+            return f"✅ Successfully processed '{filename}'\n\nProcessed content saved to: {processed_file}\n\nPreview of processed content:\n{preview}"
         
         except Exception as e:
             logger.error(f"Error processing file {filename}: {e}")
-            return f"Error processing file '{filename}': {str(e)}"
\ No newline at end of file
+            return f"Error processing file '{filename}': {str(e)}"
+    
+    async def _process_one(self, semaphore: asyncio.Semaphore, filename: str) -> str:
+        """Process a single raw file once a concurrency slot is free"""
+        async with semaphore:
+            return await self.process_raw_file(filename)
+    
+    async def process_raw_files(
+        self, filenames: List[str], concurrency: Optional[int] = None
+    ) -> List[str]:
+        """Process several raw files concurrently, returning one result per file
+        
+        At most concurrency (default MAX_CONCURRENCY) Anthropic requests are
+        in flight at once.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency or MAX_CONCURRENCY))
+        results = await asyncio.gather(
+            *(self._process_one(semaphore, filename) for filename in filenames),
+            return_exceptions=True,
+        )
+        return [
+            f"Error processing file '{filename}': {result}"
+            if isinstance(result, BaseException)
+            else result
+            for filename, result in zip(filenames, results)
+        ]
+    
+    def _save_batch_result(
+        self,
+        filename: str,
+        cache_file: Path,
+        snapshot: Tuple[os.stat_result, str],
+        message: Any,
+    ):
+        """Write a succeeded batch result into place, mark it processed and cache it
+        
+        snapshot is the (stat, hash) of the raw content that was submitted.
+        """
+        processed_content = "".join(
+            block.text for block in message.content if block.type == "text"
+        )
+        if not processed_content:
+            raise ValueError("batch result contained no text")
+        
+        processed_file = PROCESSED_DIR / filename
+        _atomic_write_bytes(processed_file, processed_content.encode('utf-8'))
+        self._invalidate_file_list(PROCESSED_DIR)
+        logger.info(f"Saved processed file: {filename}")
+        self.mark_file_processed(RAW_DIR / filename, processed_file, snapshot)
+        self._store_in_llm_cache(processed_file, cache_file)
+    
+    async def batch_process_raw_files(self, filenames: Optional[List[str]] = None) -> str:
+        """Process raw files through the Message Batches API
+        
+        Batches are billed at a discount and avoid one round trip per file,
+        at the cost of latency: the batch is polled with exponential backoff
+        until it ends. Defaults to every file that needs processing.
+        """
+        if not self.anthropic_client:
+            return "Error: ANTHROPIC_API_KEY not configured. Please set the API key in your environment."
+        
+        if filenames is None:
+            filenames = [
+                f.name for f in await asyncio.to_thread(self.get_files_needing_processing)
+            ]
+        if not filenames:
+            return "All files are up to date - no processing needed"
+        
+        # custom_id only allows [a-zA-Z0-9_-], so map positional ids back to filenames
+        requests = []
+        id_to_request: Dict[str, Tuple[str, Path, Tuple[os.stat_result, str]]] = {}
+        processed = []
+        errors = []
+        for index, filename in enumerate(filenames):
+            # Keep the stat and hash of what is submitted: results can arrive
+            # hours later, after the note may have been edited again
+            try:
+                raw_content, st, file_hash = await asyncio.to_thread(
+                    self._read_raw_snapshot, filename
+                )
+            except Exception as e:
+                logger.error(f"Failed to read {filename}: {e}")
+                errors.append(f"Error: Could not read file '{filename}'")
+                continue
+            snapshot = (st, file_hash)
+            
+            params = self._build_message_params(raw_content)
+            cache_file = self._llm_cache_file(params)
+            try:
+                restored = await asyncio.to_thread(
+                    self._restore_from_llm_cache, cache_file, PROCESSED_DIR / filename
+                ) is not None
+                if restored:
+                    await asyncio.to_thread(
+                        self.mark_file_processed,
+                        RAW_DIR / filename,
+                        PROCESSED_DIR / filename,
+                        snapshot,
+                    )
+            except Exception as e:
+                logger.error(f"Error restoring cached response for {filename}: {e}")
+                errors.append(f"Error processing file '{filename}': {str(e)}")
+                continue
+            if restored:
+                processed.append(filename)
+                continue
+            
+            custom_id = f"file-{index}"
+            id_to_request[custom_id] = (filename, cache_file, snapshot)
+            requests.append({"custom_id": custom_id, "params": params})
+        
+        if not requests:
+            result_text = f"✅ Restored {len(processed)} of {len(filenames)} files from the LLM cache" + "".join(
+                f"\n• {filename}" for filename in processed
+            )
+            if errors:
+                result_text += "\n\n" + "\n".join(errors)
+            return result_text
+        
+        try:
+            await self._request_limiter.acquire()
+            batch = await self.anthropic_client.messages.batches.create(requests=requests)
+        except Exception as e:
+            logger.error(f"Error submitting message batch: {e}")
+            return f"Error submitting message batch: {str(e)}"
+        logger.info(f"Submitted message batch {batch.id} with {len(requests)} files")
+        
+        try:
+            delay = BATCH_POLL_INITIAL_INTERVAL
+            while batch.processing_status != "ended":
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, BATCH_POLL_MAX_INTERVAL)
+                batch = await self.anthropic_client.messages.batches.retrieve(batch.id)
+            
+            async for entry in await self.anthropic_client.messages.batches.results(batch.id):
+                filename, cache_file, snapshot = id_to_request[entry.custom_id]
+                if entry.result.type != "succeeded":
+                    errors.append(f"Error processing file '{filename}': batch request {entry.result.type}")
+                    continue
+                
+                # One bad result must not discard the others, which are already paid for
+                try:
+                    await asyncio.to_thread(
+                        self._save_batch_result,
+                        filename,
+                        cache_file,
+                        snapshot,
+                        entry.result.message,
+                    )
+                except Exception as e:
+                    logger.error(f"Error saving batch result for {filename}: {e}")
+                    errors.append(f"Error processing file '{filename}': {str(e)}")
+                    continue
+                processed.append(filename)
+        
+        except Exception as e:
+            # Keep whatever was saved; the batch id lets the rest be fetched later
+            logger.error(f"Error running message batch {batch.id}: {e}")
+            errors.append(f"Error running message batch {batch.id}: {str(e)}")
+        
+        result_text = f"✅ Batch {batch.id} processed {len(processed)} of {len(filenames)} files" + "".join(
+            f"\n• {filename}" for filename in processed
+        )
+        if errors:
+            result_text += "\n\n" + "\n".join(errors)
+        return result_text
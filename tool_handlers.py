@@ -4,14 +4,18 @@ Provides a structured approach to managing tool handlers
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional, Callable, Awaitable
-from mcp.types import ContentBlock, Tool
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+from mcp.types import ContentBlock, TextContent, Tool
 from loguru import logger
 
 
 class BaseToolHandler(ABC):
     """Base class for all tool handlers with common functionality"""
 
+    # Names of arguments that must be present and non-empty, checked by
+    # validate_required_args
+    REQUIRED: Tuple[str, ...] = ()
+
     def __init__(self, storage):
         self.storage = storage
 
@@ -24,51 +28,72 @@ class BaseToolHandler(ABC):
 
     @abstractmethod
     def get_tool_definition(self) -> Tool:
-        """Return the tool definition for MCP server registration"""
+        """Return the tool definition for MCP server registration
+
+        Definitions are static, so implementations may memoize the result.
+        """
         pass
 
-    def validate_required_args(
-        self, arguments: Dict[str, Any], required: List[str]
-    ) -> Optional[str]:
-        """Validate that required arguments are present and non-empty"""
-        for arg in required:
+    def validate_required_args(self, arguments: Dict[str, Any]) -> Optional[str]:
+        """Validate that the REQUIRED arguments are present and non-empty"""
+        for arg in self.REQUIRED:
             if not arguments.get(arg):
                 return f"Error: {arg} is required"
         return None
 
+    def create_text_response(self, text: str) -> List[ContentBlock]:
+        """Wrap text in the content list returned by execute"""
+        return [TextContent(type="text", text=text)]
+
 
 class ToolRegistry:
     """Registry for managing tool handlers"""
 
     def __init__(self):
         self._handlers: Dict[str, BaseToolHandler] = {}
+        self._tool_definitions: Optional[Tuple[Tool, ...]] = None
+        self._tool_names: Optional[Tuple[str, ...]] = None
 
     def register(self, name: str, handler: BaseToolHandler):
         """Register a tool handler"""
         self._handlers[name] = handler
+        self._tool_definitions = None
+        self._tool_names = None
         logger.debug(f"Registered tool handler: {name}")
 
     def get_handler(self, name: str) -> Optional[BaseToolHandler]:
         """Get a tool handler by name"""
         return self._handlers.get(name)
 
-    def list_tool_names(self) -> List[str]:
-        """List all registered tool names"""
-        return list(self._handlers.keys())
+    def list_tool_names(self) -> Tuple[str, ...]:
+        """List all registered tool names
+
+        Built on first use and reused until another handler is registered.
+        """
+        if self._tool_names is None:
+            self._tool_names = tuple(self._handlers)
+        return self._tool_names
 
-    def get_tool_definitions(self) -> List[Tool]:
-        """Get all tool definitions for MCP server registration"""
-        return [handler.get_tool_definition() for handler in self._handlers.values()]
+    def get_tool_definitions(self) -> Tuple[Tool, ...]:
+        """Get all tool definitions for MCP server registration
+
+        Built on first use and reused until another handler is registered.
+        """
+        if self._tool_definitions is None:
+            self._tool_definitions = tuple(
+                handler.get_tool_definition() for handler in self._handlers.values()
+            )
+        return self._tool_definitions
 
     async def execute_tool(
         self, name: str, arguments: Dict[str, Any]
-    ) -> List[TextContent | ImageContent | AudioContent]:
+    ) -> List[ContentBlock]:
         """Execute a tool by name with error handling"""
-        try:
-            handler = self.get_handler(name)
-            if not handler:
-                return [TextContent(type="text", text=f"Unknown tool: {name}")]
+        handler = self._handlers.get(name)
+        if handler is None:
+            return [TextContent(type="text", text=f"Unknown tool: {name}")]
 
+        try:
             return await handler.execute(arguments)
 
         except Exception as e: